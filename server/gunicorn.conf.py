@@ -0,0 +1,16 @@
+"""
+Gunicorn configuration for the maritime optimization service
+Usage: cd server && gunicorn -c gunicorn.conf.py optimizer_api:app
+"""
+
+import multiprocessing
+
+# Run on port 5001 (Express runs on 5000)
+bind = '0.0.0.0:5001'
+
+# Optimization requests are pure CPU work, so scale with processes, not threads
+workers = multiprocessing.cpu_count()
+worker_class = 'sync'
+
+# Load the app once in the master so workers fork with it already imported
+preload_app = True
@@ -1,12 +1,41 @@
 """
 Maritime Emissions Optimization Service
-Uses scipy.optimize for advanced optimization of ship operational parameters
+Closed-form optimization of ship operational parameters
 """
 
-from scipy.optimize import minimize, differential_evolution
 import numpy as np
 from typing import Dict, List, Optional, Tuple
-import json
+import bisect
+import functools
+import orjson
+
+
+# Cleaner fuels evaluated as switching options for conventional-fuel ships
+_CONVENTIONAL_FUELS = frozenset({'HFO', 'MDO', 'MGO'})
+_ALTERNATIVE_FUELS = ('LNG', 'Methanol')
+
+# Static recommendation suggestions, shared across requests
+_FUEL_REDUCTION_SUGGESTIONS = (
+    'Optimize speed (slow steaming)',
+    'Improve hull maintenance and cleaning',
+    'Optimize trim and ballast',
+    'Use weather routing systems',
+)
+_DISTANCE_INCREASE_SUGGESTIONS = (
+    'Optimize cargo capacity utilization',
+    'Reduce ballast voyages',
+    'Improve route planning',
+)
+_DISTANCE_REDUCTION_SUGGESTIONS = (
+    'Optimize port selection',
+    'Improve route planning',
+    'Reduce waiting times',
+)
+_FUEL_SWITCHING_SUGGESTIONS = (
+    'Evaluate LNG conversion feasibility',
+    'Consider dual-fuel engines for new builds',
+    'Assess methanol availability at ports',
+)
 
 
 class MaritimeOptimizer:
@@ -40,13 +69,30 @@ class MaritimeOptimizer:
         2038: 0.35, 2039: 0.37, 2040: 0.39,
     }
     
+    # Fallbacks for fuel types, ship types and years missing from the tables above
+    DEFAULT_CO2_FACTOR = 3.114
+    DEFAULT_SHIP_TYPE = 'Bulk Carrier'
+    DEFAULT_REDUCTION_FACTOR = 0.09
+    
+    # Operational bounds as (min, max) fractions of current values
+    FUEL_BOUNDS = (0.7, 1.0)  # Can reduce fuel up to 30%, don't increase
+    DISTANCE_BOUNDS = (0.8, 1.2)  # Can change distance by up to 20%
+    
+    # Ratings from worst to best, and the max attained/required ratio per rating
+    _RATING_ORDER = ('E', 'D', 'C', 'B', 'A')
+    _RATING_TARGET_THRESHOLDS = {'A': 0.88, 'B': 0.94, 'C': 1.06, 'D': 1.18}
+    
+    # Sorted A-D ratio bounds for bisect lookups; anything above the last is E
+    _RATING_THRESHOLDS = tuple(_RATING_TARGET_THRESHOLDS.values())
+    _RATINGS = 'ABCDE'
+    
     def __init__(self):
         pass
     
     def calculate_cii(self, fuel_consumption: float, distance: float, 
                      capacity: float, fuel_type: str) -> float:
         """Calculate Carbon Intensity Indicator"""
-        cf = self.CO2_FACTORS.get(fuel_type, 3.114)
+        cf = self.CO2_FACTORS.get(fuel_type, self.DEFAULT_CO2_FACTOR)
         co2_emissions = fuel_consumption * cf
         transport_work = capacity * distance
         if transport_work == 0:
@@ -55,40 +101,119 @@ class MaritimeOptimizer:
     
     def calculate_required_cii(self, ship_type: str, capacity: float, year: int) -> float:
         """Calculate required CII for given ship type, capacity, and year"""
-        baseline = self.CII_BASELINES.get(ship_type, self.CII_BASELINES['Bulk Carrier'])
-        base_cii = baseline['a'] * (capacity ** -baseline['c'])
-        
-        reduction = self.CII_REDUCTION_FACTORS.get(year, 0.09)
+        return self._required_cii_cached(ship_type, capacity, year)
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def _required_cii_cached(ship_type: str, capacity: float, year: int) -> float:
+        """Memoized required CII; repeat requests for the same ship skip the pow()"""
+        a, c, reduction = MaritimeOptimizer._required_cii_factors(ship_type, year)
+        return MaritimeOptimizer._required_cii_formula(a, c, reduction, capacity)
+    
+    @classmethod
+    def _required_cii_factors(cls, ship_type: str, year: int) -> Tuple[float, float, float]:
+        """Baseline a, c and the yearly reduction factor, with the default fallbacks"""
+        baseline = cls.CII_BASELINES.get(ship_type, cls.CII_BASELINES[cls.DEFAULT_SHIP_TYPE])
+        reduction = cls.CII_REDUCTION_FACTORS.get(year, cls.DEFAULT_REDUCTION_FACTOR)
+        return baseline['a'], baseline['c'], reduction
+    
+    @staticmethod
+    def _required_cii_formula(a, c, reduction, capacity):
+        """Required CII from baseline factors; works on floats and NumPy arrays alike"""
+        base_cii = a * (capacity ** -c)
         return base_cii * (1 - reduction)
     
     def get_cii_rating(self, attained_cii: float, required_cii: float) -> str:
         """Get CII rating (A-E) based on attained vs required"""
         ratio = attained_cii / required_cii
-        
-        if ratio <= 0.88:
-            return 'A'
-        elif ratio <= 0.94:
-            return 'B'
-        elif ratio <= 1.06:
-            return 'C'
-        elif ratio <= 1.18:
-            return 'D'
-        else:
+        # The negated check also sends NaN ratios to E, as the old if/elif chain did
+        if not ratio <= self._RATING_THRESHOLDS[-1]:
             return 'E'
+        return self._RATINGS[bisect.bisect_left(self._RATING_THRESHOLDS, ratio)]
+    
+    def calculate_fleet_cii(self, ships: List[Dict]) -> List[Dict]:
+        """
+        Calculate attained CII, required CII and rating for many ships at once
+        
+        Args:
+            ships: list of {'currentParams': {...}, 'shipInfo': {...}} entries,
+                   shaped like the single-ship optimize_cii arguments
+        
+        Returns:
+            One {'currentCII', 'requiredCII', 'rating'} dict per ship, in order
+        
+        Raises:
+            ValueError: if a ship is missing fields, has non-numeric fuel,
+                        distance or capacity, or yields a non-finite CII
+        """
+        if not ships:
+            return []
+        
+        rows = []
+        for i, ship in enumerate(ships):
+            try:
+                params = ship['currentParams']
+                info = ship['shipInfo']
+                numbers = (params['annualFuelConsumption'], params['distanceTraveled'],
+                           info['capacity'])
+                cf = self.CO2_FACTORS.get(params['fuelType'], self.DEFAULT_CO2_FACTOR)
+                factors = self._required_cii_factors(info['shipType'], info['year'])
+            except (KeyError, TypeError):
+                raise ValueError(f'Ship {i}: missing required fields') from None
+            if not all(isinstance(n, (int, float)) and not isinstance(n, bool) for n in numbers):
+                raise ValueError(f'Ship {i}: fuel, distance and capacity must be numbers')
+            rows.append(numbers + (cf,) + factors)
+        
+        fuel, distance, capacity, cf, a, c, reduction = np.array(rows, dtype=float).T
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            attained = fuel * cf / (capacity * distance) * 1_000_000
+            required = self._required_cii_formula(a, c, reduction, capacity)
+        
+        invalid = np.flatnonzero(~(np.isfinite(attained) & np.isfinite(required)))
+        if invalid.size:
+            raise ValueError(
+                f'Ships {invalid.tolist()}: CII is not finite, check capacity and distance'
+            )
+        
+        rating_idx = np.searchsorted(self._RATING_THRESHOLDS, attained / required)
+        
+        return [
+            {
+                'currentCII': round(attained_cii, 2),
+                'requiredCII': round(required_cii, 2),
+                'rating': self._RATINGS[idx]
+            }
+            for attained_cii, required_cii, idx in zip(
+                attained.tolist(), required.tolist(), rating_idx.tolist()
+            )
+        ]
     
     def get_target_cii_for_rating(self, required_cii: float, target_rating: str) -> float:
         """Calculate the maximum CII value for a target rating"""
-        rating_thresholds = {
-            'A': 0.88,
-            'B': 0.94,
-            'C': 1.06,
-            'D': 1.18,
-        }
+        if target_rating not in self._RATING_TARGET_THRESHOLDS:
+            return required_cii * self._RATING_TARGET_THRESHOLDS['A']  # Default to A rating
         
-        if target_rating not in rating_thresholds:
-            return required_cii * 0.88  # Default to A rating
-        
-        return required_cii * rating_thresholds[target_rating]
+        return required_cii * self._RATING_TARGET_THRESHOLDS[target_rating]
+    
+    def _unchanged_result(self, message: str, current_params: Dict, current_rating: str,
+                          target_rating: str, current_cii: float, target_cii: float,
+                          required_cii: float) -> Dict:
+        """Result for a ship that already meets its target; the optimum is the current state"""
+        return {
+            'success': True,
+            'message': message,
+            'currentRating': current_rating,
+            'targetRating': target_rating,
+            'achievedRating': current_rating,
+            'currentCII': round(current_cii, 2),
+            'targetCII': round(target_cii, 2),
+            'optimizedCII': round(current_cii, 2),
+            'requiredCII': round(required_cii, 2),
+            'improvement': 0.0,
+            'recommendations': [],
+            'optimizedParams': current_params
+        }
     
     def optimize_cii(self, current_params: Dict, ship_info: Dict, 
                     target_rating: Optional[str] = None) -> Dict:
@@ -111,17 +236,27 @@ class MaritimeOptimizer:
         Returns:
             Optimization results with recommendations
         """
+        # Unpack request fields once instead of re-indexing the dicts throughout
+        current_fuel = current_params['annualFuelConsumption']
+        current_distance = current_params['distanceTraveled']
+        fuel_type = current_params['fuelType']
+        capacity = ship_info['capacity']
+        
+        # Resolve the CO2 factor once and reuse it for every CII evaluation
+        cf = self.CO2_FACTORS.get(fuel_type, self.DEFAULT_CO2_FACTOR)
+        
+        def cii_of(fuel: float, distance: float, fuel_cf: float = cf) -> float:
+            transport_work = capacity * distance
+            if transport_work == 0:
+                return float('inf')
+            return (fuel * fuel_cf / transport_work) * 1_000_000
+        
         # Calculate current CII and rating
-        current_cii = self.calculate_cii(
-            current_params['annualFuelConsumption'],
-            current_params['distanceTraveled'],
-            ship_info['capacity'],
-            current_params['fuelType']
-        )
+        current_cii = cii_of(current_fuel, current_distance)
         
         required_cii = self.calculate_required_cii(
             ship_info['shipType'],
-            ship_info['capacity'],
+            capacity,
             ship_info['year']
         )
         
@@ -129,133 +264,94 @@ class MaritimeOptimizer:
         
         # Determine target rating (one level better if not specified)
         if target_rating is None:
-            rating_order = ['E', 'D', 'C', 'B', 'A']
-            current_idx = rating_order.index(current_rating)
-            target_rating = rating_order[min(current_idx + 1, 4)]
+            current_idx = self._RATING_ORDER.index(current_rating)
+            target_rating = self._RATING_ORDER[min(current_idx + 1, 4)]
         
         # If already at A rating, return current params
         if current_rating == 'A':
-            return {
-                'success': True,
-                'message': 'Already at optimal A rating',
-                'currentRating': current_rating,
-                'targetRating': 'A',
-                'currentCII': round(current_cii, 2),
-                'targetCII': round(required_cii * 0.88, 2),
-                'recommendations': [],
-                'optimizedParams': current_params
-            }
+            return self._unchanged_result(
+                'Already at optimal A rating', current_params, current_rating, 'A',
+                current_cii, required_cii * self._RATING_TARGET_THRESHOLDS['A'], required_cii
+            )
+        
+        # A lenient or stale targetRating may already be met, nothing to optimize.
+        # E has no upper CII bound, so it is always met by the current CII
+        if target_rating in self._RATING_ORDER and (
+            self._RATING_ORDER.index(current_rating) >= self._RATING_ORDER.index(target_rating)
+        ):
+            if target_rating == 'E':
+                met_cii = current_cii
+            else:
+                met_cii = self.get_target_cii_for_rating(required_cii, target_rating)
+            return self._unchanged_result(
+                f'Already meets target {target_rating} rating', current_params,
+                current_rating, target_rating, current_cii, met_cii, required_cii
+            )
         
         # Calculate target CII value
         target_cii = self.get_target_cii_for_rating(required_cii, target_rating)
         
         # Optimization bounds
-        fuel_min = current_params['annualFuelConsumption'] * 0.7  # Can reduce up to 30%
-        fuel_max = current_params['annualFuelConsumption'] * 1.0  # Don't increase
-        dist_min = current_params['distanceTraveled'] * 0.8  # Can reduce up to 20%
-        dist_max = current_params['distanceTraveled'] * 1.2  # Can increase up to 20%
-        
-        # Define objective function (minimize CII)
-        def objective(x):
-            fuel, distance = x
-            cii = self.calculate_cii(fuel, distance, ship_info['capacity'], 
-                                     current_params['fuelType'])
-            # Penalize if above target
-            penalty = max(0, cii - target_cii) * 100
-            return cii + penalty
-        
-        # Initial guess
-        x0 = np.array([current_params['annualFuelConsumption'], 
-                       current_params['distanceTraveled']])
+        fuel_min = current_fuel * self.FUEL_BOUNDS[0]
+        dist_max = current_distance * self.DISTANCE_BOUNDS[1]
         
-        # Bounds
-        bounds = [(fuel_min, fuel_max), (dist_min, dist_max)]
-        
-        # Optimize using differential evolution for global optimization
-        result = differential_evolution(
-            objective,
-            bounds,
-            maxiter=100,
-            seed=42,
-            atol=0.01,
-            tol=0.01
-        )
-        
-        optimized_fuel, optimized_distance = result.x
-        optimized_cii = self.calculate_cii(
-            optimized_fuel, optimized_distance, 
-            ship_info['capacity'], current_params['fuelType']
-        )
+        # CII is increasing in fuel and decreasing in distance, so its minimum
+        # over the bounds is always the (fuel_min, dist_max) corner
+        optimized_fuel = fuel_min
+        optimized_distance = dist_max
+        optimized_cii = cii_of(optimized_fuel, optimized_distance)
         optimized_rating = self.get_cii_rating(optimized_cii, required_cii)
         
         # Generate recommendations
         recommendations = []
         
-        fuel_reduction_pct = ((current_params['annualFuelConsumption'] - optimized_fuel) / 
-                             current_params['annualFuelConsumption']) * 100
+        fuel_reduction_pct = ((current_fuel - optimized_fuel) / current_fuel) * 100
         if fuel_reduction_pct > 1:
             recommendations.append({
                 'type': 'fuel_reduction',
                 'title': 'Reduce Fuel Consumption',
                 'description': f'Reduce annual fuel consumption by {fuel_reduction_pct:.1f}%',
-                'from': round(current_params['annualFuelConsumption'], 2),
+                'from': round(current_fuel, 2),
                 'to': round(optimized_fuel, 2),
                 'unit': 'tonnes',
                 'impact': 'high',
-                'suggestions': [
-                    'Optimize speed (slow steaming)',
-                    'Improve hull maintenance and cleaning',
-                    'Optimize trim and ballast',
-                    'Use weather routing systems'
-                ]
+                'suggestions': _FUEL_REDUCTION_SUGGESTIONS
             })
         
-        distance_change_pct = ((optimized_distance - current_params['distanceTraveled']) / 
-                              current_params['distanceTraveled']) * 100
+        distance_change_pct = ((optimized_distance - current_distance) / current_distance) * 100
         if abs(distance_change_pct) > 1:
             if distance_change_pct > 0:
                 recommendations.append({
                     'type': 'distance_increase',
                     'title': 'Optimize Route Efficiency',
                     'description': f'Increase operational distance by {distance_change_pct:.1f}% while maintaining fuel efficiency',
-                    'from': round(current_params['distanceTraveled'], 2),
+                    'from': round(current_distance, 2),
                     'to': round(optimized_distance, 2),
                     'unit': 'nautical miles',
                     'impact': 'medium',
-                    'suggestions': [
-                        'Optimize cargo capacity utilization',
-                        'Reduce ballast voyages',
-                        'Improve route planning'
-                    ]
+                    'suggestions': _DISTANCE_INCREASE_SUGGESTIONS
                 })
             else:
                 recommendations.append({
                     'type': 'distance_reduction',
                     'title': 'Reduce Unnecessary Distance',
                     'description': f'Reduce travel distance by {abs(distance_change_pct):.1f}%',
-                    'from': round(current_params['distanceTraveled'], 2),
+                    'from': round(current_distance, 2),
                     'to': round(optimized_distance, 2),
                     'unit': 'nautical miles',
                     'impact': 'medium',
-                    'suggestions': [
-                        'Optimize port selection',
-                        'Improve route planning',
-                        'Reduce waiting times'
-                    ]
+                    'suggestions': _DISTANCE_REDUCTION_SUGGESTIONS
                 })
         
         # Check if fuel switching could help
-        if current_params['fuelType'] in ['HFO', 'MDO', 'MGO']:
+        if fuel_type in _CONVENTIONAL_FUELS:
             alternative_fuels = []
-            for fuel_type in ['LNG', 'Methanol']:
-                alt_cii = self.calculate_cii(
-                    optimized_fuel, optimized_distance,
-                    ship_info['capacity'], fuel_type
-                )
+            for alt_fuel in _ALTERNATIVE_FUELS:
+                alt_cii = cii_of(optimized_fuel, optimized_distance, self.CO2_FACTORS[alt_fuel])
                 alt_rating = self.get_cii_rating(alt_cii, required_cii)
                 if alt_rating < current_rating or (alt_rating == target_rating and alt_cii < optimized_cii):
                     alternative_fuels.append({
-                        'fuel': fuel_type,
+                        'fuel': alt_fuel,
                         'cii': round(alt_cii, 2),
                         'rating': alt_rating,
                         'improvement': round(((current_cii - alt_cii) / current_cii) * 100, 1)
@@ -268,15 +364,11 @@ class MaritimeOptimizer:
                     'description': 'Switching to cleaner fuels can significantly improve CII rating',
                     'impact': 'high',
                     'alternatives': alternative_fuels,
-                    'suggestions': [
-                        'Evaluate LNG conversion feasibility',
-                        'Consider dual-fuel engines for new builds',
-                        'Assess methanol availability at ports'
-                    ]
+                    'suggestions': _FUEL_SWITCHING_SUGGESTIONS
                 })
         
         return {
-            'success': result.success,
+            'success': True,
             'currentRating': current_rating,
             'targetRating': target_rating,
             'achievedRating': optimized_rating,
@@ -289,11 +381,15 @@ class MaritimeOptimizer:
             'optimizedParams': {
                 'annualFuelConsumption': round(optimized_fuel, 2),
                 'distanceTraveled': round(optimized_distance, 2),
-                'fuelType': current_params['fuelType']
+                'fuelType': fuel_type
             }
         }
 
 
+# Shared instance; the optimizer holds no per-request state
+optimizer = MaritimeOptimizer()
+
+
 def optimize_cii_endpoint(request_data: str) -> str:
     """
     API endpoint function for CII optimization
@@ -305,19 +401,18 @@ def optimize_cii_endpoint(request_data: str) -> str:
         JSON string with optimization results
     """
     try:
-        data = json.loads(request_data)
-        optimizer = MaritimeOptimizer()
+        data = orjson.loads(request_data)
         result = optimizer.optimize_cii(
             data['currentParams'],
             data['shipInfo'],
             data.get('targetRating')
         )
-        return json.dumps(result)
+        return orjson.dumps(result).decode()
     except Exception as e:
-        return json.dumps({
+        return orjson.dumps({
             'success': False,
             'error': str(e)
-        })
+        }).decode()
 
 
 if __name__ == '__main__':
@@ -334,6 +429,5 @@ if __name__ == '__main__':
         'year': 2025
     }
     
-    optimizer = MaritimeOptimizer()
     result = optimizer.optimize_cii(test_params, test_ship)
-    print(json.dumps(result, indent=2))
+    print(orjson.dumps(result, option=orjson.OPT_INDENT_2).decode())
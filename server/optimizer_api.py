@@ -3,15 +3,44 @@ Flask API server for maritime optimization service
 Runs alongside the Express server
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request
 from flask_cors import CORS
-from optimizer import MaritimeOptimizer
-import json
+from optimizer import optimizer
+import functools
+import orjson
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend requests
 
-optimizer = MaritimeOptimizer()
+# Number of distinct request bodies whose serialized responses are kept, so
+# repeat requests for the same ship skip the optimization entirely
+RESPONSE_CACHE_SIZE = 1024
+
+
+def _json_response(payload, status: int = 200):
+    """Serialize a response body with orjson; bytes are sent as-is"""
+    if not isinstance(payload, bytes):
+        payload = orjson.dumps(payload)
+    return app.response_class(payload, status=status, mimetype='application/json')
+
+
+@functools.lru_cache(maxsize=RESPONSE_CACHE_SIZE)
+def _optimize_cii_response(body: bytes) -> bytes:
+    """Optimize and serialize once per distinct request body (LRU, thread-safe)"""
+    data = orjson.loads(body) if body else None
+    
+    if not data:
+        raise ValueError('No data provided')
+    
+    if 'currentParams' not in data or 'shipInfo' not in data:
+        raise ValueError('Missing required fields')
+    
+    result = optimizer.optimize_cii(
+        data['currentParams'],
+        data['shipInfo'],
+        data.get('targetRating')
+    )
+    return orjson.dumps(result)
 
 
 @app.route('/api/optimize/cii', methods=['POST'])
@@ -35,33 +64,66 @@ def optimize_cii():
     }
     """
     try:
-        data = request.get_json()
+        return _json_response(_optimize_cii_response(request.get_data()))
+    
+    except ValueError as e:
+        # Malformed JSON or missing fields; errors are never cached
+        return _json_response({'success': False, 'error': str(e)}, 400)
+    
+    except Exception as e:
+        return _json_response({
+            'success': False,
+            'error': str(e)
+        }, 500)
+
+
+@app.route('/api/optimize/cii/batch', methods=['POST'])
+def calculate_fleet_cii():
+    """
+    Calculate CII and rating for a whole fleet in one request
+    
+    Request body:
+    {
+        "ships": [
+            {
+                "currentParams": {...},
+                "shipInfo": {...}
+            },
+            ...
+        ]
+    }
+    """
+    try:
+        body = request.get_data()
+        data = orjson.loads(body) if body else None
         
         if not data:
-            return jsonify({'success': False, 'error': 'No data provided'}), 400
+            return _json_response({'success': False, 'error': 'No data provided'}, 400)
         
-        if 'currentParams' not in data or 'shipInfo' not in data:
-            return jsonify({'success': False, 'error': 'Missing required fields'}), 400
+        ships = data.get('ships') if isinstance(data, dict) else None
+        if not isinstance(ships, list):
+            return _json_response({'success': False, 'error': 'Missing required fields'}, 400)
         
-        result = optimizer.optimize_cii(
-            data['currentParams'],
-            data['shipInfo'],
-            data.get('targetRating')
-        )
-        
-        return jsonify(result)
+        return _json_response({
+            'success': True,
+            'results': optimizer.calculate_fleet_cii(ships)
+        })
+    
+    except ValueError as e:
+        # Malformed JSON or invalid ship entries reported by calculate_fleet_cii
+        return _json_response({'success': False, 'error': str(e)}, 400)
     
     except Exception as e:
-        return jsonify({
+        return _json_response({
             'success': False,
             'error': str(e)
-        }), 500
+        }, 500)
 
 
 @app.route('/api/optimize/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({
+    return _json_response({
         'status': 'healthy',
         'service': 'maritime-optimizer',
         'version': '1.0.0'
@@ -70,4 +132,4 @@ def health_check():
 
 if __name__ == '__main__':
     # Run on port 5001 (Express runs on 5000)
-    app.run(host='0.0.0.0', port=5001, debug=True)
+    app.run(host='0.0.0.0', port=5001, debug=False)
@@ -11,13 +11,9 @@ if errorlevel 1 (
     exit /b 1
 )
 
-REM Check if pip packages are installed
+REM Install or update Python dependencies (no-op when already satisfied)
 echo Checking Python dependencies...
-pip show scipy >nul 2>&1
-if errorlevel 1 (
-    echo Installing Python dependencies...
-    pip install -r server\requirements.txt
-)
+pip install -q -r server\requirements.txt
 
 echo.
 echo Starting Python Optimization Service on port 5001...
@@ -19,6 +19,34 @@ test_request = {
     }
 }
 
+# Fleet batch: two valid ships, then a ship with zero capacity
+test_batch_request = {
+    "ships": [
+        test_request,
+        {
+            "currentParams": {
+                "annualFuelConsumption": 32000,
+                "distanceTraveled": 120000,
+                "fuelType": "MDO"
+            },
+            "shipInfo": {
+                "shipType": "Container Ship",
+                "capacity": 110000,
+                "year": 2026
+            }
+        }
+    ]
+}
+
+test_invalid_batch_request = {
+    "ships": [
+        {
+            "currentParams": test_request["currentParams"],
+            "shipInfo": {**test_request["shipInfo"], "capacity": 0}
+        }
+    ]
+}
+
 print("Testing CII Optimization API...")
 print("=" * 60)
 
@@ -74,3 +102,43 @@ except requests.exceptions.ConnectionError:
 
 except Exception as e:
     print(f"❌ Error: {e}")
+
+print("\nTesting Fleet Batch CII API...")
+print("=" * 60)
+
+try:
+    response = requests.post(
+        'http://localhost:5001/api/optimize/cii/batch',
+        json=test_batch_request,
+        headers={'Content-Type': 'application/json'}
+    )
+    
+    if response.status_code == 200:
+        result = response.json()
+        print(f"\n✅ Batch calculation successful ({len(result['results'])} ships)\n")
+        for i, ship in enumerate(result['results'], 1):
+            print(f"{i}. CII {ship['currentCII']} / required {ship['requiredCII']} → Rating {ship['rating']}")
+    else:
+        print(f"❌ Error: HTTP {response.status_code}")
+        print(response.text)
+    
+    # A ship with zero capacity must be rejected, not reported as a null CII
+    response = requests.post(
+        'http://localhost:5001/api/optimize/cii/batch',
+        json=test_invalid_batch_request,
+        headers={'Content-Type': 'application/json'}
+    )
+    
+    if response.status_code == 400:
+        print(f"\n✅ Invalid ship rejected: {response.json()['error']}")
+    else:
+        print(f"\n❌ Expected HTTP 400 for invalid ship, got {response.status_code}")
+        print(response.text)
+
+except requests.exceptions.ConnectionError:
+    print("❌ Error: Could not connect to optimization service")
+    print("Make sure the Flask API is running on port 5001")
+    print("Run: python server/optimizer_api.py")
+
+except Exception as e:
+    print(f"❌ Error: {e}")